@@ -1,136 +1,399 @@
 from typing import Optional, Dict, Any, List
-import os, requests
+import asyncio, functools, os, re, time, requests
+import httpx
+import orjson
+from requests.adapters import HTTPAdapter, Retry
 from dotenv import load_dotenv
 
+# Optional: C-accelerated fuzzy matching for typo'd queries. The heuristic
+# ranking below works without it.
+try:
+    from rapidfuzz import fuzz, process as _rf_process
+except ImportError:
+    _rf_process = None
+
 # Load .env defensively here too (prevents None keys if caller forgets)
 load_dotenv()
 
 FDC_BASE = "https://api.nal.usda.gov/fdc/v1"
 FSIS_DATA_URL = "https://data.fsis.usda.gov/resource/recalls.json"
 
+# Shared session: keep-alive pooling so repeated USDA calls skip the TCP+TLS
+# handshake, plus a light retry policy for flaky upstream responses.
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    # 429 included: USDA rate-limits the free tier, and a backed-off retry
+    # beats surfacing "Error fetching..." to the user. GET-only so nothing
+    # non-idempotent ever replays.
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    ),
+)
+_SESSION.mount("https://", _adapter)
+_SESSION.mount("http://", _adapter)
+
+# Async client for the FastAPI request path: keeps the event loop free and
+# multiplexes concurrent USDA calls over one HTTP/2 connection. Created
+# lazily so importing this module never opens sockets; main.py closes it
+# on shutdown.
+_async_client: Optional[httpx.AsyncClient] = None
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        # An explicit transport carries the pool limits and, mirroring the
+        # sync session's Retry adapter, retries transient connect failures.
+        _async_client = httpx.AsyncClient(
+            timeout=15,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30,
+                ),
+            ),
+        )
+    return _async_client
+
+async def aclose_async_client() -> None:
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+
 class FDCError(Exception): ...
 class FSISError(Exception): ...
 
+# ---- tiny TTL cache ----
+# USDA/FSIS responses are effectively static for minutes-to-hours, so
+# repeated terms ("chicken") shouldn't re-pay a 200-500 ms round trip.
+_CACHE_TTL_SECONDS = 3600
+_CACHE_MAX_ENTRIES = 1024
+
+def _ttl_cached(ttl: float = _CACHE_TTL_SECONDS):
+    """
+    Memoize fn by its positional/keyword args with a wall-clock TTL.
+    Errors are not cached; stale/overflowing entries are evicted lazily.
+    TTL is configurable because recalls go stale much faster than
+    nutrition data.
+    """
+    def deco(fn):
+        cache: Dict[Any, Any] = {}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            hit = cache.get(key)
+            if hit and now - hit[0] < ttl:
+                return hit[1]
+            value = fn(*args, **kwargs)
+            if len(cache) >= _CACHE_MAX_ENTRIES:
+                cache.clear()  # crude but O(1); full evictions are rare
+            cache[key] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return deco
+
+def _ttl_cached_async(ttl: float = _CACHE_TTL_SECONDS):
+    """
+    Async twin of _ttl_cached. Awaits the coroutine and memoizes the
+    *result* (an lru_cache on an async def would cache the coroutine
+    object, which is single-use).
+
+    Concurrent callers with the same key share one in-flight task, so K
+    simultaneous identical queries cost a single upstream request.
+    """
+    def deco(fn):
+        cache: Dict[Any, Any] = {}
+        inflight: Dict[Any, "asyncio.Task"] = {}
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            hit = cache.get(key)
+            if hit and now - hit[0] < ttl:
+                return hit[1]
+            task = inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(fn(*args, **kwargs))
+                inflight[key] = task
+                task.add_done_callback(lambda _t: inflight.pop(key, None))
+            value = await task
+            if len(cache) >= _CACHE_MAX_ENTRIES:
+                cache.clear()  # crude but O(1); full evictions are rare
+            cache[key] = (time.monotonic(), value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return deco
+
+# Recalls can change within the hour; don't serve them stale for long.
+_RECALLS_TTL_SECONDS = 900
+
+@functools.lru_cache(maxsize=1)
 def _require_api_key() -> str:
+    # The key never changes after .env is loaded at import; cache it so the
+    # per-request path skips the os.environ lookup. (A missing key raises,
+    # which lru_cache deliberately does not cache.)
     api_key = os.getenv("USDA_API_KEY")
     if not api_key:
         raise FDCError("USDA_API_KEY not set")
     return api_key
 
-def _fdc_search_json(q: str, data_type: Optional[str] = None, page_size: int = 5) -> Dict[str, Any]:
+def _fdc_search_params(q: str, data_type: Optional[str], page_size: int) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"api_key": _require_api_key(), "query": q, "pageSize": page_size}
+    if data_type:
+        # FDC accepts a comma-separated list here, e.g. "Foundation,SR Legacy".
+        params["dataType"] = data_type
+    return params
+
+def _parse_fdc_payload(content: bytes) -> Dict[str, Any]:
+    try:
+        data = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        raise FDCError("FDC returned non-JSON") from e
+    if not isinstance(data, dict):
+        raise FDCError(f"Unexpected FDC response type: {type(data).__name__}")
+    return data
+
+@_ttl_cached()
+def _fdc_search_json(
+    q: str,
+    data_type: Optional[str] = None,
+    page_size: int = 5,
+    session: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
     """
     Raw FDC /foods/search. Always returns a dict or raises FDCError.
     """
-    api_key = _require_api_key()
-    params: Dict[str, Any] = {"api_key": api_key, "query": q, "pageSize": page_size}
-    if data_type:
-        params["dataType"] = data_type
-    r = requests.get(f"{FDC_BASE}/foods/search", params=params, timeout=15)
+    params = _fdc_search_params(q, data_type, page_size)
+    r = (session or _SESSION).get(f"{FDC_BASE}/foods/search", params=params, timeout=15)
     try:
         r.raise_for_status()
     except requests.RequestException as e:
         raise FDCError(f"FDC HTTP error: {e}") from e
+    return _parse_fdc_payload(r.content)
+
+@_ttl_cached_async()
+async def _fdc_search_json_async(
+    q: str,
+    data_type: Optional[str] = None,
+    page_size: int = 5,
+) -> Dict[str, Any]:
+    """
+    Async twin of _fdc_search_json, for use inside the FastAPI event loop.
+    """
+    params = _fdc_search_params(q, data_type, page_size)
     try:
-        data = r.json()
-    except ValueError as e:
-        raise FDCError("FDC returned non-JSON") from e
-    if not isinstance(data, dict):
-        raise FDCError(f"Unexpected FDC response type: {type(data).__name__}")
-    return data
+        r = await _get_async_client().get(f"{FDC_BASE}/foods/search", params=params)
+        r.raise_for_status()
+    except httpx.HTTPError as e:
+        raise FDCError(f"FDC HTTP error: {e}") from e
+    return _parse_fdc_payload(r.content)
 
 # ---- smarter search & ranking ----
 _FDC_DATATYPES_PRIORITIZED = ["Survey (FNDDS)", "Foundation", "SR Legacy", "Branded"]
 
-def _fdc_search_multi(term: str, per_type: int = 5) -> List[Dict[str, Any]]:
+# The ranking/context path only ever reads these keys; dropping the rest of
+# the (large) FDC food objects right after decode keeps the cached hits small.
+_FDC_KEEP_FIELDS = (
+    "fdcId", "description", "brandOwner", "ingredients",
+    "foodCategory", "dataType", "foodNutrients",
+)
+
+def _merge_prioritized_foods(data: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
-    Query multiple FDC dataTypes (prioritized) and merge results.
+    Bucket a batched search response by dataType so the merged list keeps
+    the same prioritized ordering the old per-dataType calls produced.
+    Each hit is trimmed to _FDC_KEEP_FIELDS on the way through.
     """
+    foods = data.get("foods") or []
+    if not isinstance(foods, list):
+        return []
+    buckets: Dict[str, List[Dict[str, Any]]] = {dt: [] for dt in _FDC_DATATYPES_PRIORITIZED}
+    leftovers: List[Dict[str, Any]] = []
+    for f in foods:
+        if not isinstance(f, dict):
+            continue
+        trimmed = {k: f.get(k) for k in _FDC_KEEP_FIELDS}
+        buckets.get(trimmed.get("dataType"), leftovers).append(trimmed)
     all_hits: List[Dict[str, Any]] = []
     for dt in _FDC_DATATYPES_PRIORITIZED:
-        try:
-            data = _fdc_search_json(term, data_type=dt, page_size=per_type)
-        except Exception:
-            continue
-        foods = data.get("foods") or []
-        if isinstance(foods, list):
-            all_hits.extend([f for f in foods if isinstance(f, dict)])
+        all_hits.extend(buckets[dt])
+    all_hits.extend(leftovers)
     return all_hits
 
-def _score_fdc_hit(term: str, f: Dict[str, Any]) -> float:
+@_ttl_cached()
+def _fdc_search_multi(term: str, per_type: int = 5) -> List[Dict[str, Any]]:
+    """
+    Query multiple FDC dataTypes (prioritized) in one batched request.
+    FDC's /foods/search takes dataType as a comma-separated list, so a
+    single call replaces the old one-request-per-dataType fan-out.
+    """
+    try:
+        data = _fdc_search_json(
+            term,
+            data_type=",".join(_FDC_DATATYPES_PRIORITIZED),
+            page_size=per_type * len(_FDC_DATATYPES_PRIORITIZED),
+        )
+    except Exception:
+        return []
+    return _merge_prioritized_foods(data)
+
+async def _fdc_search_multi_async(term: str, per_type: int = 5) -> List[Dict[str, Any]]:
+    """
+    Async twin of _fdc_search_multi (same single batched request).
+    """
+    try:
+        data = await _fdc_search_json_async(
+            term,
+            data_type=",".join(_FDC_DATATYPES_PRIORITIZED),
+            page_size=per_type * len(_FDC_DATATYPES_PRIORITIZED),
+        )
+    except Exception:
+        return []
+    return _merge_prioritized_foods(data)
+
+# Descriptions containing these usually mean processed/supplement items,
+# not the plain food the user asked about. One compiled alternation scans
+# the description in a single C-level pass instead of seven `in` checks.
+_NEG_RE = re.compile(r"\b(?:bar|powder|supplement|shake|cereal|snack|energy)\b")
+
+def _score_fdc_hit(t: str, desc: str, ing: str, cat: str, brand: Any) -> float:
     """
     Heuristic score: favor exact/clean matches, penalize irrelevant branded/supplement items.
+    Takes pre-lowered strings so callers ranking many hits lower each field once.
     """
-    t = term.strip().lower()
-    desc = str(f.get("description") or "").lower()
-    brand = f.get("brandOwner")
-    ing = str(f.get("ingredients") or "").lower()
     score = 0.0
     if desc == t or desc.startswith(t): score += 10
     if t in desc: score += 6
     if t and t in ing: score += 4
     score += -2 if brand else 1
-    cat = str(f.get("foodCategory") or "").lower()
     if t in cat: score += 2
-    if any(bt in desc for bt in ["bar","powder","supplement","shake","cereal","snack","energy"]): score -= 3
+    if _NEG_RE.search(desc): score -= 3
     return score
 
 def _pick_best_fdc_hit(term: str, foods: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not foods:
         return None
-    filtered = [
-        f for f in foods
-        if term.lower() in str(f.get("description","")).lower()
-        or term.lower() in str(f.get("ingredients","")).lower()
-        or not any(isinstance(f.get(k), str) for k in ("description","ingredients"))
-    ]
-    candidates = filtered if filtered else foods
-    return max(candidates, key=lambda f: _score_fdc_hit(term, f))
+    t = term.strip().lower()
+    # One fused pass: lower each field once, short-circuit on an exact
+    # description match, and track the argmax while filtering instead of
+    # materializing a filtered list and re-scoring it under max().
+    best: Optional[Dict[str, Any]] = None
+    best_score = float("-inf")
+    blind: Optional[Dict[str, Any]] = None
+    blind_score = float("-inf")
+    descs: List[str] = []  # kept for the fuzzy fallback below
+    for f in foods:
+        desc = str(f.get("description") or "").lower()
+        if desc == t:
+            # Exact match would out-score everything anyway.
+            return f
+        ing = str(f.get("ingredients") or "").lower()
+        cat = str(f.get("foodCategory") or "").lower()
+        score = _score_fdc_hit(t, desc, ing, cat, f.get("brandOwner"))
+        if (
+            t in desc
+            or t in ing
+            or not any(isinstance(f.get(k), str) for k in ("description", "ingredients"))
+        ):
+            if score > best_score:
+                best, best_score = f, score
+        elif score > blind_score:
+            blind, blind_score = f, score
+        descs.append(desc)
+    if best is not None:
+        return best
+    if _rf_process is not None:
+        # Nothing contains the term verbatim — likely a typo. One C-level
+        # fuzzy pass over the descriptions beats scoring blind.
+        match = _rf_process.extractOne(t, descs, scorer=fuzz.WRatio)
+        if match and match[1] >= 70 and not _NEG_RE.search(match[0]):
+            return foods[match[2]]
+    return blind
 
 # ---- FSIS recalls (open data) ----
-def _fsis_recalls_json(query: Optional[str] = None, status: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
-    """
-    Always returns a dict: {"results": [ simplified items ... ]} or raises FSISError.
-    """
+# Output field -> candidate source keys, tried in order. The FSIS feed has
+# shifted key names over time, hence the fallbacks.
+_FSIS_FIELDS = (
+    ("title", ("title", "recall_title", "headline")),
+    ("recall_number", ("recall_number", "id")),
+    ("status", ("status",)),
+    ("risk_level", ("classification", "class")),
+    ("reason", ("reason", "reason_for_recall")),
+    ("date", ("recall_initiation_date", "date", "publication_date", "start_date")),
+    ("link", ("url", "link")),
+)
+
+def _fsis_params(query: Optional[str], status: Optional[str], limit: int) -> Dict[str, Any]:
     params: Dict[str, Any] = {"$limit": limit}
     if status:
         params["status"] = status  # e.g., "Active"
     if query:
         params["$q"] = query       # full-text search
+    return params
 
+def _parse_fsis_payload(content: bytes, limit: int) -> Dict[str, Any]:
     try:
-        r = requests.get(FSIS_DATA_URL, params=params, timeout=15)
-        r.raise_for_status()
-        raw = r.json()
-    except requests.RequestException as e:
-        raise FSISError(f"FSIS HTTP error: {e}") from e
-    except ValueError as e:
+        raw = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
         raise FSISError("FSIS returned non-JSON") from e
-
     if not isinstance(raw, list):
         raise FSISError(f"Unexpected FSIS response type: {type(raw).__name__}")
+    simplified: List[Dict[str, Any]] = [
+        {out: next((it[k] for k in keys if it.get(k)), None) for out, keys in _FSIS_FIELDS}
+        for it in raw[:limit]
+        if isinstance(it, dict)
+    ]
+    return {"results": simplified}
 
-    simplified: List[Dict[str, Any]] = []
-    for it in raw[:limit]:
-        if not isinstance(it, dict):
-            continue
-        simplified.append({
-            "title": it.get("title") or it.get("recall_title") or it.get("headline"),
-            "recall_number": it.get("recall_number") or it.get("id"),
-            "status": it.get("status"),
-            "risk_level": it.get("classification") or it.get("class"),
-            "reason": it.get("reason") or it.get("reason_for_recall"),
-            "date": it.get("recall_initiation_date") or it.get("date") or it.get("publication_date") or it.get("start_date"),
-            "link": it.get("url") or it.get("link"),
-        })
+@_ttl_cached(ttl=_RECALLS_TTL_SECONDS)
+def _fsis_recalls_json(query: Optional[str] = None, status: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
+    """
+    Always returns a dict: {"results": [ simplified items ... ]} or raises FSISError.
+    """
+    try:
+        r = _SESSION.get(FSIS_DATA_URL, params=_fsis_params(query, status, limit), timeout=15)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        raise FSISError(f"FSIS HTTP error: {e}") from e
+    return _parse_fsis_payload(r.content, limit)
 
-    return {"results": simplified}
+@_ttl_cached_async(ttl=_RECALLS_TTL_SECONDS)
+async def _fsis_recalls_json_async(
+    query: Optional[str] = None, status: Optional[str] = None, limit: int = 5
+) -> Dict[str, Any]:
+    """
+    Async twin of _fsis_recalls_json.
+    """
+    try:
+        r = await _get_async_client().get(FSIS_DATA_URL, params=_fsis_params(query, status, limit))
+        r.raise_for_status()
+    except httpx.HTTPError as e:
+        raise FSISError(f"FSIS HTTP error: {e}") from e
+    return _parse_fsis_payload(r.content, limit)
 
 # Optional: explicit exports
 __all__ = [
     "FDC_BASE",
     "_require_api_key",
     "_fdc_search_json",
+    "_fdc_search_json_async",
     "_fdc_search_multi",
+    "_fdc_search_multi_async",
     "_pick_best_fdc_hit",
     "_fsis_recalls_json",
+    "_fsis_recalls_json_async",
+    "aclose_async_client",
 ]
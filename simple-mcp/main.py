@@ -1,23 +1,69 @@
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from typing import Optional, Dict, Any, List
+import asyncio
 import re
+import string
 
 # LLM glue (optional)
 from utils.ai_client import ask_ai
 
 # USDA helpers
 from helpers_usda import (
-    _fdc_search_json,        # raw FDC search (JSON)
-    _fdc_search_multi,       # multi-datatype search
-    _pick_best_fdc_hit,      # ranking
-    _fsis_recalls_json,      # FSIS open-data recalls (JSON)
+    _fdc_search_json,          # raw FDC search (JSON)
+    _fdc_search_multi_async,   # multi-datatype search (async)
+    _get_async_client,         # shared httpx client (lifespan-managed here)
+    _pick_best_fdc_hit,        # ranking
+    _fsis_recalls_json,        # FSIS open-data recalls (JSON)
+    _fsis_recalls_json_async,  # async twin for the event-loop path
+    aclose_async_client,       # shutdown hook for the shared httpx client
 )
 
 # Ensure .env is loaded for anything that reads env on import (defensive)
 load_dotenv()
 
-app = FastAPI()
+# orjson serializes our dict responses (which can carry multi-KB context
+# strings) several times faster than the stdlib JSONResponse path.
+app = FastAPI(default_response_class=ORJSONResponse)
+
+
+async def _warm_caches() -> None:
+    # Pre-warm the hot endpoints so the first real user doesn't pay the
+    # cold 200-500 ms round trips; failures here are non-fatal (e.g. no
+    # API key in a dev shell) and the request path will just fetch cold.
+    # Call shapes must match the request path exactly, or we fill cache
+    # keys nothing ever reads: fsis_recall_context uses (query=term,
+    # limit=3) and fdc_context uses (term, per_type=8).
+    try:
+        await asyncio.gather(
+            _fsis_recalls_json_async(query="chicken", limit=3),
+            _fdc_search_multi_async("apple", per_type=8),
+            return_exceptions=True,
+        )
+    except Exception:
+        pass
+
+
+# Strong reference to the startup warm task: the event loop only keeps a
+# weak one, so an unreferenced task can be garbage-collected mid-flight.
+_warm_task: Optional["asyncio.Task"] = None
+
+
+@app.on_event("startup")
+async def _startup() -> None:
+    global _warm_task
+    # Open the pooled client before the first request so no caller pays
+    # its construction cost.
+    _get_async_client()
+    # Warm in the background; don't hold up binding the port.
+    _warm_task = asyncio.create_task(_warm_caches())
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    await aclose_async_client()
 
 
 # ------------------------
@@ -38,24 +84,40 @@ def home():
 # ------------------------
 # Unified LLM-style endpoint
 # ------------------------
+
+# Intent detection, compiled once: a single alternation scan per intent
+# instead of rebuilding keyword lists and running N substring checks
+# on every request.
+_RECALL_INTENT_RE = re.compile(r"recall|safety|fsis|alert", re.I)
+_NUTRITION_INTENT_RE = re.compile(r"nutrition|fdc|nutrient|calorie|ingredient", re.I)
+
 @app.post("/query")
 async def handle_query(request: Request):
     body = await request.json()
     query: str = body.get("query", "")
 
-    qlow = query.lower()
-    if any(k in qlow for k in ["recall", "safety", "fsis", "alert"]):
-        context = fsis_recall_context(query)
-    elif any(k in qlow for k in ["nutrition", "fdc", "nutrient", "calorie", "ingredient"]):
-        context = fdc_context(query)
+    wants_recall = bool(_RECALL_INTENT_RE.search(query))
+    wants_nutrition = bool(_NUTRITION_INTENT_RE.search(query))
+    if wants_recall and wants_nutrition:
+        # Both intents (e.g. "recalls and nutrition for chicken"): fetch
+        # concurrently so wall time is the slower of the two, not the sum.
+        recall_ctx, fdc_ctx = await asyncio.gather(
+            fsis_recall_context(query), fdc_context(query)
+        )
+        context = f"{recall_ctx} || {fdc_ctx}"
+    elif wants_recall:
+        context = await fsis_recall_context(query)
+    elif wants_nutrition:
+        context = await fdc_context(query)
     else:
         context = (
             "No USDA context found. Try recalls (e.g., 'any chicken recalls?') "
             "or nutrition (e.g., 'nutrition for apple')."
         )
 
-    # Optional: feed context to your LLM
-    ai_response = ask_ai(query, context)
+    # Optional: feed context to your LLM. The Gemini SDK call is blocking
+    # (1-3s), so run it in the threadpool to keep the event loop free.
+    ai_response = await run_in_threadpool(ask_ai, query, context)
     return {"query": query, "context": context, "response": ai_response}
 
 
@@ -69,16 +131,18 @@ def fdc_search(q: str, dataType: Optional[str] = None, pageSize: int = 5) -> Dic
 @app.get("/fdc/food/{fdc_id}")
 def fdc_food(fdc_id: int) -> Dict[str, Any]:
     # simple passthrough convenience
-    from helpers_usda import FDC_BASE, _require_api_key
+    from helpers_usda import FDC_BASE, _SESSION, _require_api_key
+    import orjson
     api_key = _require_api_key()
-    import requests
-    r = requests.get(
+    r = _SESSION.get(
         f"{FDC_BASE}/food/{fdc_id}",
         params={"api_key": api_key},
         timeout=15
     )
     r.raise_for_status()
-    return r.json()
+    # These detail payloads run to hundreds of KB; orjson decodes them a
+    # few times faster than requests' stdlib-json path.
+    return orjson.loads(r.content)
 
 
 # ------------------------
@@ -95,16 +159,23 @@ def fsis_recalls(status: Optional[str] = None, query: Optional[str] = None, limi
 # ------------------------
 # Context builders (string outputs)
 # ------------------------
-STOP_WORDS = {
+STOP_WORDS = frozenset({
     "nutrition", "nutritional", "calorie", "calories", "macro", "macros",
     "facts", "info", "information", "data", "content", "about", "for", "of"
-}
+})
+
+# Compiled once; re's internal cache would re-hash these per call otherwise.
+_FOOD_TERM_RE = re.compile(r"(?:for|of)\s+([A-Za-z0-9 \-_.]+)", re.I)
+
+# Punctuation -> space in one C-level translate pass (keep hyphens/underscores,
+# which appear in food names).
+_PUNCT_TABLE = str.maketrans({c: " " for c in string.punctuation if c not in "-_"})
 
 def extract_food_term(q: str) -> Optional[str]:
     """
     Pulls the word(s) after 'for' or 'of' if present.
     """
-    m = re.search(r"(?:for|of)\s+([A-Za-z0-9 \-_.]+)", q, flags=re.I)
+    m = _FOOD_TERM_RE.search(q)
     return m.group(1).strip() if m else None
 
 def _normalize_food_term(raw: str) -> str:
@@ -112,26 +183,34 @@ def _normalize_food_term(raw: str) -> str:
     Strip punctuation and remove stop-words like 'nutrition' so
     'chicken nutrition' -> 'chicken'.
     """
-    cleaned = re.sub(r"[^\w\s\-]", " ", raw.lower()).strip()
+    cleaned = raw.lower().translate(_PUNCT_TABLE).strip()
     tokens = [t for t in cleaned.split() if t not in STOP_WORDS]
     return " ".join(tokens) if tokens else raw.split()[0]
 
-def fdc_context(query: str) -> str:
+# Search responses can carry 100+ nutrients per food; we only surface these.
+_WANTED_NUTRIENTS = frozenset(
+    {"Energy", "Protein", "Total lipid (fat)", "Carbohydrate, by difference", "Sodium, Na"}
+)
+
+async def fdc_context(query: str) -> str:
     raw = extract_food_term(query) or query
     term = _normalize_food_term(raw)
 
     try:
-        hits = _fdc_search_multi(term, per_type=8)
+        hits = await _fdc_search_multi_async(term, per_type=8)
         if not hits:
             # Fallback: try last token (e.g., from "grilled chicken breast" -> "breast" / "chicken")
             last = term.split()[-1]
             if last != term:
-                hits = _fdc_search_multi(last, per_type=8)
+                hits = await _fdc_search_multi_async(last, per_type=8)
                 term = last
     except Exception as e:
         return f"Error fetching FDC context: {e}"
 
-    best = _pick_best_fdc_hit(term, hits)
+    # Scoring is pure CPU; push it off the event loop so slow upstream
+    # payloads (32 candidates x several fields each) never stall other
+    # connections.
+    best = await asyncio.to_thread(_pick_best_fdc_hit, term, hits)
     if not best:
         return f"No FDC results for '{term}'."
 
@@ -140,23 +219,29 @@ def fdc_context(query: str) -> str:
     brand = best.get("brandOwner")
     nutrients = best.get("foodNutrients") or []
 
-    wanted = {"Energy", "Protein", "Total lipid (fat)", "Carbohydrate, by difference", "Sodium, Na"}
     picked: List[str] = []
     if isinstance(nutrients, list):
+        remaining = set(_WANTED_NUTRIENTS)
         for n in nutrients:
-            if isinstance(n, dict) and n.get("nutrientName") in wanted:
+            name = n.get("nutrientName") if isinstance(n, dict) else None
+            if name in remaining:
                 unit = n.get("unitName", "")
                 val = n.get("value")
-                picked.append(f"{n.get('nutrientName')}: {val}{unit}")
+                picked.append(f"{name}: {val}{unit}")
+                remaining.discard(name)  # e.g. Energy appears as both kcal and kJ
+                if len(picked) == 4:
+                    # Only four make it into the context string; stop
+                    # scanning the (possibly 100+-entry) nutrient list.
+                    break
 
-    core = ", ".join(picked[:4]) if picked else "Key nutrients not available."
+    core = ", ".join(picked) if picked else "Key nutrients not available."
     brand_part = f" ({brand})" if brand else ""
     return f"FDC Match for '{term}': {desc}{brand_part}, fdcId={fdc_id}. {core}"
 
-def fsis_recall_context(query: str) -> str:
+async def fsis_recall_context(query: str) -> str:
     term = extract_food_term(query) or query
     try:
-        data = _fsis_recalls_json(query=term, limit=3)
+        data = await _fsis_recalls_json_async(query=term, limit=3)
     except Exception as e:
         return f"Error fetching FSIS recalls: {e}"
 
@@ -166,3 +251,15 @@ def fsis_recall_context(query: str) -> str:
 
     parts = [f"{h.get('title')} (Class={h.get('risk_level')}, Status={h.get('status')})" for h in hits]
     return " | ".join(parts)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # uvicorn[standard] pulls in uvloop + httptools; "auto" selects them
+    # when available. Single worker on purpose: the TTL caches are
+    # in-process and the hot path is network-bound, not CPU-bound.
+    # Access logging is pure per-request overhead on this demo path.
+    uvicorn.run(
+        "main:app", host="127.0.0.1", port=8000,
+        loop="auto", http="auto", access_log=False,
+    )
@@ -1,8 +1,20 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 
 st.set_page_config(page_title="Simple MCP Demo", page_icon="^_^", layout="centered")
 
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    # One keep-alive session for the whole app run, so repeat Ask clicks
+    # reuse the TCP connection to the MCP server instead of opening a new
+    # socket per click.
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return session
+
 st.title("Model Context Protocol Demo")
 st.write("Ask me about food, and I’ll fetch live context before answering!")
 
@@ -12,7 +24,7 @@ submit = st.button("Ask")
 if submit and query.strip():
     with st.spinner("Fetching context and generating response..."):
         try:
-            response = requests.post(
+            response = get_session().post(
                 "http://127.0.0.1:8000/query",
                 json={"query": query},
                 timeout=20
@@ -1,4 +1,6 @@
+import hashlib
 import os
+import time
 from google import genai
 from dotenv import load_dotenv
 
@@ -9,6 +11,15 @@ load_dotenv()
 # The client automatically looks for the GEMINI_API_KEY environment variable.
 client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
+_MODEL = "gemini-2.5-flash"  # A powerful and fast model for general tasks
+
+# The LLM round trip is the slowest, priciest step in the pipeline, and demo
+# queries repeat (Streamlit reruns, retries). Memoize by (model, prompt)
+# digest for a day; identical prompts then return instantly and unbilled.
+_CACHE_TTL_SECONDS = 86400
+_CACHE_MAX_ENTRIES = 256
+_response_cache = {}
+
 def ask_ai(query, context):
     """
     Sends a query and context to the Gemini model for a grounded answer.
@@ -20,14 +31,22 @@ def ask_ai(query, context):
         "Answer based *only* on the context above."
     )
 
+    key = hashlib.sha256(f"{_MODEL}|{prompt}".encode()).hexdigest()
+    hit = _response_cache.get(key)
+    if hit and time.monotonic() - hit[0] < _CACHE_TTL_SECONDS:
+        return hit[1]
+
     # Call the Gemini API
     response = client.models.generate_content(
-        model="gemini-2.5-flash", # A powerful and fast model for general tasks
+        model=_MODEL,
         contents=prompt
     )
 
     # The response object is structured differently,
     # the text is directly accessible via the .text attribute.
+    if len(_response_cache) >= _CACHE_MAX_ENTRIES:
+        _response_cache.clear()
+    _response_cache[key] = (time.monotonic(), response.text)
     return response.text
 
 # --- Example Usage (Assuming you have a GEMINI_API_KEY in your .env file) ---